@@ -1,6 +1,7 @@
 __all__ = [
     "compose_preview",
+    "composite_layers",
+    "prepare_layers",
 ]
 
-from .compose import compose_preview
-
+from .compose import compose_preview, composite_layers, prepare_layers
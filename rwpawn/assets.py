@@ -1,8 +1,17 @@
 from __future__ import annotations
 
+import logging
+import os
+import stat
+import sys
+import tempfile
+import threading
+from functools import lru_cache
 from pathlib import Path
-from typing import Iterable, List, Optional, Tuple
+from typing import Dict, Iterable, List, Optional, Tuple
 
+import numpy as np
+import PIL
 from PIL import Image
 
 try:
@@ -10,8 +19,20 @@ try:
 except Exception:  # pragma: no cover - optional during bootstrap
     PSDImage = None  # type: ignore
 
+logger = logging.getLogger(__name__)
 
-DIRECTIONS = ["north", "south", "east"]
+# Pillow-SIMD is a drop-in Pillow build with SSE4/AVX2 resize/composite kernels;
+# its releases are versioned like "9.5.0.post1".
+PILLOW_SIMD = ".post" in PIL.__version__
+if not PILLOW_SIMD:
+    logger.debug("Pillow %s is not a Pillow-SIMD build; resize/composite use the scalar kernels", PIL.__version__)
+
+# Assets are local sprites chosen by the user, so skip the decompression-bomb size check on open
+Image.MAX_IMAGE_PIXELS = None
+
+
+# Interned so per-direction dict keys built from CLI input compare by identity
+DIRECTIONS = [sys.intern(d) for d in ("north", "south", "east")]
 
 
 # Basic apparel categorization for better layering
@@ -47,43 +68,197 @@ SHIRTS = {"ShirtBasic", "ShirtButton"}
 PANTS = {"Pants", "FlakPants"}
 BELTS_PACKS = {"ShieldBelt", "FirefoamPack", "SmokepopPack"}
 
+# Apparel name -> layer category; later entries win, matching categorize()'s old check order
+_CATEGORY: dict[str, str] = {
+    **{n: "headgear" for n in HEADGEAR},
+    **{n: "belt" for n in BELTS_PACKS},
+    **{n: "outer" for n in OUTER},
+    **{n: "shirt" for n in SHIRTS},
+    **{n: "pants" for n in PANTS},
+}
+
 
 def load_png(path: Path) -> Image.Image:
-    return Image.open(path).convert("RGBA")
+    img = Image.open(path)
+    # Decode eagerly so the file handle is released now rather than at GC time
+    img.load()
+    # Most sprites are already RGBA; convert() would copy the whole buffer anyway
+    return img if img.mode == "RGBA" else img.convert("RGBA")
 
 
-def load_psd(path: Path) -> Optional[Image.Image]:
-    if PSDImage is None:
+def load_png_np(path: Path) -> np.ndarray:
+    """Decode a PNG into a (H, W, 4) uint8 RGBA array."""
+    return np.asarray(load_png(path))
+
+
+# One lock per PSD path so concurrent loads of one file composite it only once,
+# while different files still composite in parallel
+_PSD_LOCKS: Dict[Path, threading.Lock] = {}
+_PSD_LOCKS_GUARD = threading.Lock()
+
+
+def _psd_lock(path: Path) -> threading.Lock:
+    with _PSD_LOCKS_GUARD:
+        return _PSD_LOCKS.setdefault(path, threading.Lock())
+
+
+def _psd_sidecar(path: Path) -> Path:
+    return path.with_suffix(".psd.cached.png")
+
+
+def _load_fresh_sidecar(path: Path) -> Optional[Image.Image]:
+    sidecar = _psd_sidecar(path)
+    try:
+        if sidecar.stat().st_mtime < path.stat().st_mtime:
+            return None
+    except OSError:
+        return None
+    try:
+        return load_png(sidecar)
+    except OSError:
+        # Corrupt or unreadable (UnidentifiedImageError is an OSError); drop it and re-composite
+        try:
+            sidecar.unlink()
+        except OSError:
+            pass
         return None
-    psd = PSDImage.open(path)
-    img = psd.composite()
-    return img.convert("RGBA")
 
 
-def normalize_image(img: Image.Image, target: Tuple[int, int] = (128, 128)) -> Image.Image:
+def _write_sidecar(path: Path, img: Image.Image) -> None:
+    # Write to a temp file beside the PSD then rename, so readers never see a partial PNG.
+    # Read-only asset folders simply go uncached.
+    tmp_name = None
+    try:
+        with tempfile.NamedTemporaryFile(dir=path.parent, prefix=".", suffix=".png", delete=False) as tmp:
+            tmp_name = tmp.name
+            img.save(tmp, "PNG")
+        # NamedTemporaryFile creates 0600; match the PSD so other users can read the sidecar
+        os.chmod(tmp_name, stat.S_IMODE(path.stat().st_mode))
+        os.replace(tmp_name, _psd_sidecar(path))
+    except OSError:
+        if tmp_name is not None:
+            try:
+                os.unlink(tmp_name)
+            except OSError:
+                pass
+
+
+def load_psd(path: Path) -> Optional[Image.Image]:
+    """Composite a PSD, reusing a ``<name>.psd.cached.png`` sidecar when it is newer than the PSD."""
+    img = _load_fresh_sidecar(path)
+    if img is not None:
+        return img
+    if PSDImage is None:
+        return None
+    with _psd_lock(path):
+        # Another thread may have composited this file while we waited
+        img = _load_fresh_sidecar(path)
+        if img is not None:
+            return img
+        psd = PSDImage.open(path)
+        img = psd.composite()
+        if img.mode != "RGBA":
+            img = img.convert("RGBA")
+        _write_sidecar(path, img)
+    return img
+
+
+def normalize_image(arr: np.ndarray, target: Tuple[int, int] = (128, 128)) -> np.ndarray:
     tw, th = target
-    w, h = img.size
+    h, w = arr.shape[:2]
     if (w, h) == (tw, th):
-        return img
-    # Many beards are 256x256; downscale by exactly half for alignment
+        return arr
+    # Many beards are 256x256; downscale by exactly half for alignment.
+    # An exact 2:1 reduction needs no multi-tap kernel: BOX averages each 2x2 block.
     if (w, h) == (256, 256):
-        return img.resize((128, 128), Image.LANCZOS)
+        return np.asarray(Image.fromarray(arr).resize((128, 128), Image.BOX))
     # Otherwise paste centered without scaling to preserve authored offsets
-    canvas = Image.new("RGBA", target, (0, 0, 0, 0))
+    # The canvas starts fully transparent, so this is a plain copy rather than a blend.
+    # Like Image.paste, anything outside the target is clipped, so sprites larger than
+    # the target in either axis are center-cropped instead of raising.
+    canvas = np.zeros((th, tw, 4), np.uint8)
     ox = (tw - w) // 2
     oy = (th - h) // 2
-    canvas.alpha_composite(img, (ox, oy))
+    sx, sy = max(-ox, 0), max(-oy, 0)
+    dx, dy = max(ox, 0), max(oy, 0)
+    cw, ch = min(w - sx, tw - dx), min(h - sy, th - dy)
+    canvas[dy:dy + ch, dx:dx + cw] = arr[sy:sy + ch, sx:sx + cw]
     return canvas
 
 
-def find_body(assets_root: Path, body_type: str, direction: str) -> Optional[Image.Image]:
-    p = assets_root / "Bodies" / f"Naked_{body_type}_{direction}.png"
-    if p.exists():
-        return normalize_image(load_png(p))
+@lru_cache(maxsize=256)
+def _cached_load(path_str: str, mtime_ns: int, kind: str, normalize: bool = True) -> Optional[np.ndarray]:
+    """Decode (and normalize) an asset once per (path, mtime) into an RGBA array.
+
+    Returned arrays are shared between callers and are marked read-only;
+    compositing and recoloring always produce new arrays.
+    """
+    path = Path(path_str)
+    if kind == ".png":
+        arr = load_png_np(path)
+    elif kind == ".psd":
+        img = load_psd(path)
+        if img is None:
+            return None
+        arr = np.asarray(img)
+    else:
+        return None
+    if normalize:
+        arr = normalize_image(arr)
+    arr.flags.writeable = False
+    return arr
+
+
+def _load(path: Path, normalize: bool = True) -> Optional[np.ndarray]:
+    return _cached_load(str(path), path.stat().st_mtime_ns, path.suffix.lower(), normalize)
+
+
+@lru_cache(maxsize=None)
+def _dir_index(dirpath: str) -> dict[str, Path]:
+    """Map entry names to paths for one directory, listed once per process (missing dirs are empty)."""
+    try:
+        with os.scandir(dirpath) as it:
+            return {e.name: Path(e.path) for e in it}
+    except OSError:
+        return {}
+
+
+@lru_cache(maxsize=None)
+def _dir_index_lower(dirpath: str) -> dict[str, Path]:
+    """Case-insensitive view of ``_dir_index``."""
+    return {name.lower(): path for name, path in _dir_index(dirpath).items()}
+
+
+def _find_file(dirpath: str, name: str) -> Optional[Path]:
+    """Exact-case entry lookup, falling back to a case-insensitive match.
+
+    Asset names come from the command line, and the old Path.exists() probes were
+    case-insensitive on macOS and Windows filesystems.
+    """
+    p = _dir_index(dirpath).get(name)
+    if p is None:
+        p = _dir_index_lower(dirpath).get(name.lower())
+    return p
+
+
+@lru_cache(maxsize=None)
+def _subdirs_lower(dirpath: str) -> dict[str, Path]:
+    """Case-insensitive index of the subdirectories of one directory."""
+    try:
+        with os.scandir(dirpath) as it:
+            return {e.name.lower(): Path(e.path) for e in it if e.is_dir()}
+    except OSError:
+        return {}
+
+
+def find_body(assets_root: Path, body_type: str, direction: str) -> Optional[np.ndarray]:
+    p = _find_file(str(assets_root / "Bodies"), f"Naked_{body_type}_{direction}.png")
+    if p is not None:
+        return _load(p)
     return None
 
 
-def find_head(assets_root: Path, head_name: Optional[str], direction: str) -> Optional[Image.Image]:
+def find_head(assets_root: Path, head_name: Optional[str], direction: str) -> Optional[np.ndarray]:
     """Head files are usually under Heads/<Gender>/<HeadName>_<dir>.png or at top-level for special cases.
     Example: Heads/Female/Female_Average_Normal_south.png
              Heads/None_Average_Skull_south.psd
@@ -97,114 +272,107 @@ def find_head(assets_root: Path, head_name: Optional[str], direction: str) -> Op
     if gender_prefix in {"Male", "Female"}:
         subdir = gender_prefix
 
-    candidates: list[Path] = []
-    if subdir:
-        candidates.extend([
-            assets_root / "Heads" / subdir / f"{head_name}_{direction}.png",
-            assets_root / "Heads" / subdir / f"{head_name}_{direction}.psd",
-        ])
+    heads_dir = assets_root / "Heads"
+    search_dirs = [heads_dir / subdir] if subdir else []
     # Fallbacks at top-level
-    candidates.extend([
-        assets_root / "Heads" / f"{head_name}_{direction}.png",
-        assets_root / "Heads" / f"{head_name}_{direction}.psd",
-    ])
-    for p in candidates:
-        if p.exists():
-            if p.suffix.lower() == ".png":
-                return normalize_image(load_png(p))
-            elif p.suffix.lower() == ".psd":
-                img = load_psd(p)
-                if img is not None:
-                    return normalize_image(img)
+    search_dirs.append(heads_dir)
+    for d in search_dirs:
+        for ext in (".png", ".psd"):
+            p = _find_file(str(d), f"{head_name}_{direction}{ext}")
+            if p is None:
+                continue
+            img = _load(p)
+            if img is not None:
+                return img
     return None
 
 
-def load_eyes(assets_root: Path, eyes_name: Optional[str], gender: Optional[str]) -> Optional[Image.Image]:
+def load_eyes(assets_root: Path, eyes_name: Optional[str], gender: Optional[str]) -> Optional[np.ndarray]:
     """Eyes are 42x42 PNGs at HeadAttachments/<Eyes>/<Gender>/<Eyes>_<Gender>.png"""
     if not eyes_name:
         return None
     if gender is None:
         gender = "Male"
-    p = assets_root / "HeadAttachments" / eyes_name / gender / f"{eyes_name}_{gender}.png"
-    if p.exists():
-        return load_png(p)
+    p = _find_file(str(assets_root / "HeadAttachments" / eyes_name / gender), f"{eyes_name}_{gender}.png")
+    if p is not None:
+        return _load(p, normalize=False)
     return None
 
 
-def find_hair(assets_root: Path, hair: Optional[str], direction: str) -> Optional[Image.Image]:
+def find_hair(assets_root: Path, hair: Optional[str], direction: str) -> Optional[np.ndarray]:
     if not hair:
         return None
-    p = assets_root / "Hairs" / f"{hair}_{direction}.png"
-    if p.exists():
-        return normalize_image(load_png(p))
+    p = _find_file(str(assets_root / "Hairs"), f"{hair}_{direction}.png")
+    if p is not None:
+        return _load(p)
     return None
 
 
-def find_beard(assets_root: Path, beard: Optional[str], direction: str) -> Optional[Image.Image]:
+def find_beard(assets_root: Path, beard: Optional[str], direction: str) -> Optional[np.ndarray]:
     if not beard:
         return None
     if direction == "north":
         return None
-    p = assets_root / "Beards" / f"Beard{beard}_{direction}.png"
-    if p.exists():
-        return normalize_image(load_png(p))
+    p = _find_file(str(assets_root / "Beards"), f"Beard{beard}_{direction}.png")
+    if p is not None:
+        return _load(p)
     return None
 
 
+@lru_cache(maxsize=None)
+def _variant_index(apparel_dir: str, base_name: str) -> dict[Tuple[str, str, str], Path]:
+    """Index one apparel folder's sprites by (ext, body_type, direction), "*" where the name omits it.
+
+    ``<base>_<body>_<dir><ext>``, ``<base>_<dir><ext>`` and ``<base><ext>`` map to
+    (ext, body, dir), (ext, "*", dir) and (ext, "*", "*").
+    """
+    index: dict[Tuple[str, str, str], Path] = {}
+    for name, path in _dir_index(apparel_dir).items():
+        for ext in (".png", ".psd"):
+            if name.startswith(base_name) and name.endswith(ext):
+                break
+        else:
+            continue
+        rest = name[len(base_name):len(name) - len(ext)]
+        if not rest:
+            key = (ext, "*", "*")
+        elif rest[0] != "_":
+            continue
+        else:
+            parts = rest[1:].rsplit("_", 1)
+            key = (ext, "*", parts[0]) if len(parts) == 1 else (ext, parts[0], parts[1])
+        index[key] = path
+    return index
+
+
 def _find_apparel_variant_paths(apparel_dir: Path, base_name: str, body_type: str, direction: str) -> Iterable[Path]:
     # Try PNGs then PSDs, most specific to least
-    png_candidates = [
-        apparel_dir / f"{base_name}_{body_type}_{direction}.png",
-        apparel_dir / f"{base_name}_{direction}.png",
-        apparel_dir / f"{base_name}.png",
-    ]
-    for p in png_candidates:
-        if p.exists():
-            yield p
-    psd_candidates = [
-        apparel_dir / f"{base_name}_{body_type}_{direction}.psd",
-        apparel_dir / f"{base_name}_{direction}.psd",
-        apparel_dir / f"{base_name}.psd",
-    ]
-    for p in psd_candidates:
-        if p.exists():
-            yield p
-
-
-def load_apparel(assets_root: Path, name: str, body_type: str, direction: str) -> Optional[Image.Image]:
-    apparel_dir = assets_root / "Apparel" / name
-    if not apparel_dir.exists():
+    index = _variant_index(str(apparel_dir), base_name)
+    for ext in (".png", ".psd"):
+        for key in ((ext, body_type, direction), (ext, "*", direction), (ext, "*", "*")):
+            p = index.get(key)
+            if p is not None:
+                yield p
+
+
+def load_apparel(assets_root: Path, name: str, body_type: str, direction: str) -> Optional[np.ndarray]:
+    parent = str(assets_root / "Apparel")
+    apparel_dir = _dir_index(parent).get(name)
+    if apparel_dir is None:
         # case-insensitive fallback
-        parent = assets_root / "Apparel"
-        for d in parent.iterdir():
-            if d.is_dir() and d.name.lower() == name.lower():
-                apparel_dir = d
-                break
-        else:
+        apparel_dir = _subdirs_lower(parent).get(name.lower())
+        if apparel_dir is None:
             return None
     base_name = apparel_dir.name
     for path in _find_apparel_variant_paths(apparel_dir, base_name, body_type, direction):
-        if path.suffix.lower() == ".png":
-            return normalize_image(load_png(path))
-        elif path.suffix.lower() == ".psd":
-            img = load_psd(path)
-            if img is not None:
-                return normalize_image(img)
+        img = _load(path)
+        if img is not None:
+            return img
     return None
 
 
 def categorize(name: str) -> str:
-    if name in PANTS:
-        return "pants"
-    if name in SHIRTS:
-        return "shirt"
-    if name in OUTER:
-        return "outer"
-    if name in BELTS_PACKS:
-        return "belt"
-    if name in HEADGEAR:
-        return "headgear"
-    return "apparel"
+    return _CATEGORY.get(name, "apparel")
 
 
 def collect_apparel_images(
@@ -212,8 +380,8 @@ def collect_apparel_images(
     apparels: Iterable[str],
     body_type: str,
     direction: str,
-) -> dict[str, List[Image.Image]]:
-    out: dict[str, List[Image.Image]] = {
+) -> dict[str, List[np.ndarray]]:
+    out: dict[str, List[np.ndarray]] = {
         "pants": [],
         "shirt": [],
         "outer": [],
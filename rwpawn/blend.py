@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import numpy as np
+
+try:
+    from numba import njit  # type: ignore
+except Exception:  # pragma: no cover - optional speedup
+    njit = None  # type: ignore
+
+
+def _over_pm_np(d: np.ndarray, src: np.ndarray) -> None:
+    s = src.astype(np.float32)
+    sa = s[..., 3:] * np.float32(1 / 255)
+    s[..., :3] *= sa
+    d *= 1 - sa
+    d += s
+
+
+if njit is not None:
+
+    @njit(cache=True, nogil=True)
+    def _over_pm_jit(d, src):  # pragma: no cover - needs the jit extra
+        # Same float32 math as _over_pm_np in one pass; fully transparent pixels leave d as is
+        h, w = src.shape[0], src.shape[1]
+        inv255 = np.float32(1 / 255)
+        one = np.float32(1)
+        for y in range(h):
+            for x in range(w):
+                a = src[y, x, 3]
+                if a == 0:
+                    continue
+                sa = np.float32(a) * inv255
+                ia = one - sa
+                for c in range(3):
+                    d[y, x, c] = d[y, x, c] * ia + np.float32(src[y, x, c]) * sa
+                d[y, x, 3] = d[y, x, 3] * ia + np.float32(a)
+
+else:
+    _over_pm_jit = None
+
+
+def over_pm(acc: np.ndarray, src: np.ndarray, x: int, y: int) -> None:
+    """Porter-Duff "over" of straight-alpha RGBA ``src`` onto the premultiplied float32 ``acc`` at (x, y).
+
+    Off-canvas parts of ``src`` are clipped; the blend itself runs in numba when available.
+    """
+    h, w = src.shape[:2]
+    x0, y0 = max(x, 0), max(y, 0)
+    x1, y1 = min(x + w, acc.shape[1]), min(y + h, acc.shape[0])
+    if x0 >= x1 or y0 >= y1:
+        return
+    window = src[y0 - y:y1 - y, x0 - x:x1 - x]
+    d = acc[y0:y1, x0:x1]
+    if _over_pm_jit is not None:
+        _over_pm_jit(d, window)
+    else:
+        _over_pm_np(d, window)
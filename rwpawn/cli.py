@@ -1,9 +1,20 @@
 from __future__ import annotations
 
 import argparse
+import hashlib
+import os
+import shutil
+import string
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
+from typing import Any
 
-from .compose import compose_preview
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from .compose import Layers, compose_preview, composite_layers, prepare_layers
 
 
 def _parse_xy(val: str) -> tuple[int, int]:
@@ -23,24 +34,12 @@ def _parse_range(spec: str) -> list[int]:
         raise SystemExit(f"Invalid range '{spec}'. Use 'start:stop:step' (e.g., -8:2:2)")
     if step == 0:
         raise SystemExit("Range step cannot be 0")
-    vals: list[int] = []
-    if start <= stop and step > 0:
-        v = start
-        while v <= stop:
-            vals.append(v)
-            v += step
-    elif start >= stop and step < 0:
-        v = start
-        while v >= stop:
-            vals.append(v)
-            v += step
-    else:
-        # Allow single value case like '0:0:1'
-        if start == stop:
-            vals = [start]
-        else:
-            raise SystemExit(f"Range direction mismatch: '{spec}'")
-    return vals
+    if (step > 0 and start <= stop) or (step < 0 and start >= stop):
+        return list(range(start, stop + (1 if step > 0 else -1), step))
+    # Allow single value case like '0:0:1'
+    if start == stop:
+        return [start]
+    raise SystemExit(f"Range direction mismatch: '{spec}'")
 
 
 def _parse_color(val: str) -> tuple[int, int, int]:
@@ -60,16 +59,161 @@ def _parse_color(val: str) -> tuple[int, int, int]:
                 raise SystemExit(f"Invalid color '{val}'. Components must be 0-255")
         return (r, g, b)
     if len(s) == 6:
-        try:
-            r = int(s[0:2], 16)
-            g = int(s[2:4], 16)
-            b = int(s[4:6], 16)
-            return (r, g, b)
-        except Exception:
+        # One parse for all three channels; checking the digits first rejects the signs,
+        # spaces, underscores and 0x prefix that int() would otherwise tolerate.
+        if not all(c in string.hexdigits for c in s):
             raise SystemExit(f"Invalid color hex '{val}'")
+        v = int(s, 16)
+        return (v >> 16 & 0xFF, v >> 8 & 0xFF, v & 0xFF)
     raise SystemExit(f"Invalid color '{val}'. Use '#RRGGBB' or 'R,G,B'")
 
 
+# Least recently used outputs are evicted once the cache grows past this
+_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+
+def _cache_dir() -> Path:
+    return Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "rwpawn"
+
+
+def _manifest_digest(assets_root: Path, args: argparse.Namespace) -> bytes:
+    """Digest of (name, mtime, size) for every asset folder a render can read, plus this package's sources."""
+    dirs = [Path(__file__).parent]
+    dirs += [assets_root / sub for sub in ("Bodies", "Hairs", "Beards", "Heads", "Heads/Male", "Heads/Female")]
+    if args.eyes:
+        dirs.append(assets_root / "HeadAttachments" / args.eyes)
+        dirs += [assets_root / "HeadAttachments" / args.eyes / g for g in ("Male", "Female")]
+    # Apparel lookup falls back to case-insensitive folder names, so match the same way
+    wanted = {a.lower() for a in args.apparel}
+    try:
+        with os.scandir(assets_root / "Apparel") as it:
+            dirs += [Path(e.path) for e in it if e.name.lower() in wanted]
+    except OSError:
+        pass
+    h = hashlib.blake2b(digest_size=16)
+    for d in dirs:
+        try:
+            with os.scandir(d) as it:
+                # PSD sidecars and dot-prefixed temp files are written by rendering itself;
+                # hashing them would make a PSD-backed render change its own key
+                entries = sorted(
+                    (e.name, e.stat().st_mtime_ns, e.stat().st_size)
+                    for e in it
+                    if e.is_file() and not e.name.startswith(".") and not e.name.endswith(".psd.cached.png")
+                )
+        except OSError:
+            continue
+        h.update(repr((str(d), entries)).encode())
+    return h.digest()
+
+
+def _output_cache_key(assets_root: Path, args: argparse.Namespace) -> str:
+    # The output path and cache switch do not affect the rendered pixels
+    opts = sorted((k, v) for k, v in vars(args).items() if k not in ("out", "no_cache"))
+    return hashlib.blake2b(repr(opts).encode() + _manifest_digest(assets_root, args), digest_size=16).hexdigest()
+
+
+def _store_cached(key: str, out_path: Path) -> None:
+    try:
+        cached = _cache_dir() / f"{key}.png"
+        cached.parent.mkdir(parents=True, exist_ok=True)
+        tmp = cached.with_suffix(f".{os.getpid()}.tmp")
+        shutil.copyfile(out_path, tmp)
+        os.replace(tmp, cached)
+        _prune_cache(cached.parent)
+    except OSError:
+        # Caching is best effort; an unwritable cache dir must not fail the render
+        pass
+
+
+def _prune_cache(cache_dir: Path, max_bytes: int = _CACHE_MAX_BYTES) -> None:
+    """Delete the least recently used cached outputs until the cache fits in ``max_bytes``."""
+    entries = []
+    with os.scandir(cache_dir) as it:
+        for e in it:
+            if e.name.endswith(".png") and e.is_file():
+                st = e.stat()
+                entries.append((st.st_mtime_ns, st.st_size, e.path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.unlink(path)
+        except OSError:
+            continue
+        total -= size
+
+
+def _save_png(img: Image.Image, out_path: Path, fast: bool = True) -> None:
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    if fast:
+        # zlib level 1: several times quicker than the default 6 on large grids, slightly bigger files
+        img.save(out_path, "PNG", compress_level=1)
+    else:
+        img.save(out_path, "PNG", optimize=True)
+
+
+_DEFAULT_FONT: Any = None
+
+
+def _font() -> Any:
+    """Pillow's default font, loaded on first use and shared afterwards (None if unavailable)."""
+    global _DEFAULT_FONT
+    if _DEFAULT_FONT is None:
+        try:
+            _DEFAULT_FONT = ImageFont.load_default()
+        except Exception:
+            return None
+    return _DEFAULT_FONT
+
+
+def _draw_label(draw: ImageDraw.ImageDraw, x: int, y: int, label: str, font: Any = None) -> None:
+    # draw semi-transparent box for readability
+    bbox_w, bbox_h = draw.textbbox((0, 0), label, font=font)[2:]
+    pad = 2
+    draw.rectangle([x, y, x + bbox_w + 2 * pad, y + bbox_h + 2 * pad], fill=(0, 0, 0, 128))
+    draw.text((x + pad, y + pad), label, fill=(255, 255, 255, 255), font=font, stroke_width=1, stroke_fill=(0, 0, 0, 255))
+
+
+def _render_cell(layers: Layers, cell: np.ndarray, kwargs: dict[str, Any]) -> None:
+    """Composite one grid tile directly into its (128, 128, 4) slice of the grid buffer."""
+    composite_layers(layers, **kwargs, out=cell)
+
+
+def _render_grid(
+    layers: Layers,
+    tasks: list[tuple[dict[str, Any], str]],
+    cols: int,
+    rows: int,
+    out: str,
+    fast_save: bool = True,
+) -> None:
+    """Render grid tiles concurrently (row-major order) and write the assembled grid.
+
+    ``layers`` are loaded and recolored once; each task only supplies the offsets
+    passed to composite_layers for that cell.
+    """
+    grid_arr = np.zeros((128 * rows, 128 * cols, 4), np.uint8)
+    cells = [grid_arr[r * 128:(r + 1) * 128, c * 128:(c + 1) * 128] for r in range(rows) for c in range(cols)]
+    # Threads rather than processes: NumPy and Pillow release the GIL in the heavy
+    # loops, workers share the in-process asset cache, and each one writes straight
+    # into its own disjoint slice of grid_arr.
+    workers = max(1, min(len(tasks), os.cpu_count() or 1))
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        list(ex.map(partial(_render_cell, layers), cells, [kwargs for kwargs, _ in tasks]))
+
+    grid = Image.fromarray(grid_arr)
+    draw = ImageDraw.Draw(grid)
+    font = _font()
+    for idx, (_, label) in enumerate(tasks):
+        r, c = divmod(idx, cols)
+        _draw_label(draw, c * 128, r * 128, label, font)
+    out_path = Path(out)
+    _save_png(grid, out_path, fast_save)
+    print(f"Wrote grid {out_path} ({grid.size[0]}x{grid.size[1]}), cols={cols}, rows={rows}")
+
+
 def build_parser() -> argparse.ArgumentParser:
     p = argparse.ArgumentParser(description="Compose RimWorld humanlike pawn outfit preview (N,S,E)")
     p.add_argument("--assets-root", required=True, help="Path to Humanlike assets folder (…/Things/Pawn/Humanlike)")
@@ -116,6 +260,13 @@ def build_parser() -> argparse.ArgumentParser:
     p.add_argument("--color-belt", default=None, help="Belt/pack color (#RRGGBB or R,G,B)")
     p.add_argument("--color-apparel", default=None, help="Fallback apparel color (#RRGGBB or R,G,B)")
     p.add_argument("--out", required=True, help="Output PNG path")
+    p.add_argument(
+        "--fast-save",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help="Write PNGs with fast, light compression (default); --no-fast-save writes smaller, optimized files",
+    )
+    p.add_argument("--no-cache", action="store_true", help="Always re-render instead of reusing a cached output for identical inputs")
     return p
 
 
@@ -123,15 +274,26 @@ def main() -> None:
     parser = build_parser()
     args = parser.parse_args()
     assets_root = Path(args.assets_root)
-    dirs = [d.strip() for d in str(args.dirs).split(",") if d.strip()]
-    # default head from body-type if not provided
-    default_head = args.head
-    if default_head is None and args.body_type in ("Male", "Female"):
-        default_head = f"{args.body_type}_Average_Normal"
-
-    eyes_gender = args.eyes_gender or (args.body_type if args.body_type in ("Male", "Female") else None)
 
-    dirs = [d.strip() for d in str(args.dirs).split(",") if d.strip()]
+    # Identical arguments over unchanged assets reproduce the same PNG; reuse it
+    cache_key = None if args.no_cache else _output_cache_key(assets_root, args)
+    if cache_key is not None:
+        cached = _cache_dir() / f"{cache_key}.png"
+        if cached.exists():
+            out_path = Path(args.out)
+            out_path.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(cached, out_path)
+            try:
+                # Mark as recently used so pruning evicts colder entries first
+                os.utime(cached)
+            except OSError:
+                pass
+            with Image.open(out_path) as im:
+                print(f"Wrote {out_path} ({im.size[0]}x{im.size[1]}) from cache")
+            return
+
+    dirs = [sys.intern(d.strip()) for d in str(args.dirs).split(",") if d.strip()]
+    args.apparel = [sys.intern(a) for a in args.apparel]
     # default head from body-type if not provided
     default_head = args.head
     if default_head is None and args.body_type in ("Male", "Female"):
@@ -201,6 +363,19 @@ def main() -> None:
     if args.color_apparel:
         colors["apparel"] = _parse_color(args.color_apparel)
 
+    # Everything that selects and recolors layers; grids vary only the offsets
+    layer_args: dict[str, Any] = dict(
+        assets_root=assets_root,
+        body_type=args.body_type,
+        hair=args.hair,
+        beard=args.beard,
+        head=default_head,
+        eyes=args.eyes,
+        eyes_gender=eyes_gender,
+        apparels=args.apparel,
+        colors=colors,
+    )
+
     if args.grid_head:
         # Force single direction (use the first provided)
         if not dirs:
@@ -213,56 +388,24 @@ def main() -> None:
         xs = _parse_range(xspec)
         ys = _parse_range(yspec)
 
-        from PIL import Image, ImageDraw, ImageFont
-
-        tiles: list[Image.Image] = []
+        tasks: list[tuple[dict[str, Any], str]] = []
         base_head_off = head_offsets.get(direction, (0, 0)) if head_offsets else (0, 0)
         for y in ys:
             for x in xs:
                 # Apply offset delta on top of base
                 local_head_offsets = dict(head_offsets) if head_offsets else {}
                 local_head_offsets[direction] = (base_head_off[0] + x, base_head_off[1] + y)
-                im = compose_preview(
-                    assets_root=assets_root,
-                    body_type=args.body_type,
-                    hair=args.hair,
-                    beard=args.beard,
-                    head=default_head,
-                    eyes=args.eyes,
-                    eyes_gender=eyes_gender,
-                    apparels=args.apparel,
-                    directions=[direction],
+                kwargs = dict(
                     body_offsets=body_offsets or None,
                     head_offsets=local_head_offsets,
                     canvas_offsets=canvas_offsets or None,
-                    colors=colors,
                 )
-                # Overlay label
-                draw = ImageDraw.Draw(im)
                 label = f"({local_head_offsets[direction][0]},{local_head_offsets[direction][1]})"
-                try:
-                    font = ImageFont.load_default()
-                except Exception:
-                    font = None
-                # draw semi-transparent box for readability
-                bbox_w, bbox_h = draw.textbbox((0, 0), label, font=font)[2:]
-                pad = 2
-                draw.rectangle([0, 0, bbox_w + 2 * pad, bbox_h + 2 * pad], fill=(0, 0, 0, 128))
-                draw.text((pad, pad), label, fill=(255, 255, 255, 255), font=font, stroke_width=1, stroke_fill=(0, 0, 0, 255))
-                tiles.append(im)
+                tasks.append((kwargs, label))
 
+        layers = prepare_layers(**layer_args, directions=[direction])
         # Build grid image (cols=len(xs), rows=len(ys))
-        cols, rows = len(xs), len(ys)
-        grid = Image.new("RGBA", (128 * cols, 128 * rows), (0, 0, 0, 0))
-        idx = 0
-        for r in range(rows):
-            for c in range(cols):
-                grid.alpha_composite(tiles[idx], (c * 128, r * 128))
-                idx += 1
-        out_path = Path(args.out)
-        out_path.parent.mkdir(parents=True, exist_ok=True)
-        grid.save(out_path)
-        print(f"Wrote grid {out_path} ({grid.size[0]}x{grid.size[1]}), cols={cols}, rows={rows}")
+        _render_grid(layers, tasks, len(xs), len(ys), args.out, args.fast_save)
     elif args.grid_hair:
         if not args.hair:
             raise SystemExit("--grid-hair requires --hair to be specified")
@@ -276,9 +419,7 @@ def main() -> None:
         xs = _parse_range(xspec)
         ys = _parse_range(yspec)
 
-        from PIL import Image, ImageDraw, ImageFont
-
-        tiles = []
+        tasks = []
         # Establish base offsets from any provided args
         base_head_off = head_offsets.get(direction, (0, 0)) if head_offsets else (0, 0)
         base_hair_rel = (0, 0)
@@ -294,46 +435,18 @@ def main() -> None:
                 local_head_offsets = dict(head_offsets) if head_offsets else {}
                 local_hair_offsets_rel = {}
                 local_hair_offsets_rel[direction] = (base_hair_rel[0] + x, base_hair_rel[1] + y)
-                im = compose_preview(
-                    assets_root=assets_root,
-                    body_type=args.body_type,
-                    hair=args.hair,
-                    beard=args.beard,
-                    head=default_head,
-                    eyes=args.eyes,
-                    eyes_gender=eyes_gender,
-                    apparels=args.apparel,
-                    directions=[direction],
+                kwargs = dict(
                     body_offsets=body_offsets or None,
                     head_offsets=local_head_offsets or None,
                     hair_offsets_rel=local_hair_offsets_rel,
                     canvas_offsets=canvas_offsets or None,
-                    colors=colors,
                 )
                 # Label with relative hair offset (x,y)
-                draw = ImageDraw.Draw(im)
                 label = f"({local_hair_offsets_rel[direction][0]},{local_hair_offsets_rel[direction][1]})"
-                try:
-                    font = ImageFont.load_default()
-                except Exception:
-                    font = None
-                bbox_w, bbox_h = draw.textbbox((0, 0), label, font=font)[2:]
-                pad = 2
-                draw.rectangle([0, 0, bbox_w + 2 * pad, bbox_h + 2 * pad], fill=(0, 0, 0, 128))
-                draw.text((pad, pad), label, fill=(255, 255, 255, 255), font=font, stroke_width=1, stroke_fill=(0, 0, 0, 255))
-                tiles.append(im)
-
-        cols, rows = len(xs), len(ys)
-        grid = Image.new("RGBA", (128 * cols, 128 * rows), (0, 0, 0, 0))
-        idx = 0
-        for r in range(rows):
-            for c in range(cols):
-                grid.alpha_composite(tiles[idx], (c * 128, r * 128))
-                idx += 1
-        out_path = Path(args.out)
-        out_path.parent.mkdir(parents=True, exist_ok=True)
-        grid.save(out_path)
-        print(f"Wrote grid {out_path} ({grid.size[0]}x{grid.size[1]}), cols={cols}, rows={rows}")
+                tasks.append((kwargs, label))
+
+        layers = prepare_layers(**layer_args, directions=[direction])
+        _render_grid(layers, tasks, len(xs), len(ys), args.out, args.fast_save)
     elif args.grid_headgear:
         if not any(a for a in args.apparel):
             raise SystemExit("--grid-headgear requires at least one headgear item passed via --apparel (e.g., CowboyHat)")
@@ -347,9 +460,7 @@ def main() -> None:
         xs = _parse_range(xspec)
         ys = _parse_range(yspec)
 
-        from PIL import Image, ImageDraw, ImageFont
-
-        tiles = []
+        tasks = []
         base_head_off = head_offsets.get(direction, (0, 0)) if head_offsets else (0, 0)
         # Determine current base headgear relative offset if provided
         base_headgear_rel = (0, 0)
@@ -364,45 +475,17 @@ def main() -> None:
                 local_head_offsets = dict(head_offsets) if head_offsets else {}
                 local_headgear_offsets_rel = {}
                 local_headgear_offsets_rel[direction] = (base_headgear_rel[0] + x, base_headgear_rel[1] + y)
-                im = compose_preview(
-                    assets_root=assets_root,
-                    body_type=args.body_type,
-                    hair=args.hair,
-                    beard=args.beard,
-                    head=default_head,
-                    eyes=args.eyes,
-                    eyes_gender=eyes_gender,
-                    apparels=args.apparel,
-                    directions=[direction],
+                kwargs = dict(
                     body_offsets=body_offsets or None,
                     head_offsets=local_head_offsets or None,
                     headgear_offsets_rel=local_headgear_offsets_rel,
                     canvas_offsets=canvas_offsets or None,
-                    colors=colors,
                 )
-                draw = ImageDraw.Draw(im)
                 label = f"({local_headgear_offsets_rel[direction][0]},{local_headgear_offsets_rel[direction][1]})"
-                try:
-                    font = ImageFont.load_default()
-                except Exception:
-                    font = None
-                bbox_w, bbox_h = draw.textbbox((0, 0), label, font=font)[2:]
-                pad = 2
-                draw.rectangle([0, 0, bbox_w + 2 * pad, bbox_h + 2 * pad], fill=(0, 0, 0, 128))
-                draw.text((pad, pad), label, fill=(255, 255, 255, 255), font=font, stroke_width=1, stroke_fill=(0, 0, 0, 255))
-                tiles.append(im)
-
-        cols, rows = len(xs), len(ys)
-        grid = Image.new("RGBA", (128 * cols, 128 * rows), (0, 0, 0, 0))
-        idx = 0
-        for r in range(rows):
-            for c in range(cols):
-                grid.alpha_composite(tiles[idx], (c * 128, r * 128))
-                idx += 1
-        out_path = Path(args.out)
-        out_path.parent.mkdir(parents=True, exist_ok=True)
-        grid.save(out_path)
-        print(f"Wrote grid {out_path} ({grid.size[0]}x{grid.size[1]}), cols={cols}, rows={rows}")
+                tasks.append((kwargs, label))
+
+        layers = prepare_layers(**layer_args, directions=[direction])
+        _render_grid(layers, tasks, len(xs), len(ys), args.out, args.fast_save)
     else:
         # Relative layer offsets
         hair_offsets_rel = {}
@@ -450,9 +533,11 @@ def main() -> None:
             headgear_offsets_rel=headgear_offsets_rel or None,
         )
         out_path = Path(args.out)
-        out_path.parent.mkdir(parents=True, exist_ok=True)
-        img.save(out_path)
-        print(f"Wrote {out_path} ({img.size[0]}x{img.size[1]})")
+        _save_png(Image.fromarray(img), out_path, args.fast_save)
+        print(f"Wrote {out_path} ({img.shape[1]}x{img.shape[0]})")
+
+    if cache_key is not None:
+        _store_cached(cache_key, Path(args.out))
 
 
 if __name__ == "__main__":
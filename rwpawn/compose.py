@@ -1,9 +1,13 @@
 from __future__ import annotations
 
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Iterable, List, Dict, Tuple
+from types import MappingProxyType
+from typing import Callable, List, Dict, Mapping, Tuple, TypeVar
 
-from PIL import Image, ImageOps
+import numpy as np
 
 from .assets import (
     DIRECTIONS,
@@ -14,16 +18,114 @@ from .assets import (
     find_hair,
     load_eyes,
 )
+from .blend import over_pm
+from .tint import tint_cached
 
+T = TypeVar("T")
+U = TypeVar("U")
 
-def _composite(layers: Iterable[Image.Image], size=(128, 128)) -> Image.Image:
-    base = Image.new("RGBA", size, (0, 0, 0, 0))
-    for layer in layers:
-        base.alpha_composite(layer)
-    return base
 
+class _FrameArena(threading.local):
+    """Per-thread frame accumulator, grown on demand and handed out as a view.
 
-def compose_preview(
+    Grid workers composite one frame after another at the same cell size; reusing one
+    flat float32 buffer per thread skips allocating a fresh accumulator for each of them.
+    """
+
+    def __init__(self) -> None:
+        self._buf = np.empty(0, np.float32)
+
+    def get(self, shape: Tuple[int, ...]) -> np.ndarray:
+        """A zeroed float32 array of ``shape``, valid until the next call on this thread."""
+        n = 1
+        for dim in shape:
+            n *= dim
+        if self._buf.size < n:
+            self._buf = np.empty(n, np.float32)
+        acc = self._buf[:n].reshape(shape)
+        acc.fill(0)
+        return acc
+
+
+_ARENA = _FrameArena()
+
+
+def _composite_np(
+    imgs: List[np.ndarray], xs: List[int], ys: List[int], origin: Tuple[int, int], dst: np.ndarray
+) -> None:
+    """Fold ``imgs`` placed at (``xs``, ``ys``) into the (H, W, 4) uint8 view ``dst``, clipped to it.
+
+    ``origin`` is the position that maps to the top-left pixel of ``dst``.
+
+    Layers accumulate in premultiplied float32, so each one is a multiply-add
+    and the divide back to straight alpha and the uint8 rounding happen once per frame.
+    """
+    acc = _ARENA.get(dst.shape)
+    ox, oy = origin
+    for im, x, y in zip(imgs, xs, ys):
+        over_pm(acc, im, x - ox, y - oy)
+    a = acc[..., 3:]
+    rgb = acc[..., :3]
+    np.multiply(rgb, 255, out=rgb)
+    np.divide(rgb, a, out=rgb, where=a > 0)
+    acc += 0.5
+    dst[...] = acc
+
+
+def _map_dirs(fn: Callable[[U], T], dirs: List[U]) -> List[T]:
+    """``[fn(d) for d in dirs]``, with one thread per direction when there are several.
+
+    Directions are independent and the heavy lifting (decode, NumPy blends) releases the GIL.
+    """
+    if len(dirs) < 2:
+        return [fn(d) for d in dirs]
+    with ThreadPoolExecutor(max_workers=len(dirs)) as ex:
+        return list(ex.map(fn, dirs))
+
+
+Offsets = Mapping[str, Tuple[int, int]]
+
+_NO_OFFSETS: Offsets = MappingProxyType({})
+# Base canvas shift applied before composing (prevents clipping)
+_DEFAULT_CANVAS_OFFSETS: Offsets = MappingProxyType({"north": (0, 0), "south": (0, 10), "east": (0, 0)})
+# Defaults: per-direction head offset, and relative offsets for hair/eyes/headgear w.r.t head
+_DEFAULT_HEAD_OFFSETS: Offsets = MappingProxyType({"south": (0, -30), "north": (0, 0), "east": (0, 0)})
+# Per your calibration, use south (0,-5) as baseline for head-relative layers
+_DEFAULT_HAIR_OFFSETS_REL: Offsets = MappingProxyType({"south": (0, -5), "north": (0, 0), "east": (0, 0)})
+_DEFAULT_EYES_OFFSETS_REL: Offsets = MappingProxyType({"south": (0, -5), "north": (0, 0), "east": (0, 0)})
+_DEFAULT_BEARD_OFFSETS_REL: Offsets = MappingProxyType({"south": (0, -5), "north": (0, 0), "east": (0, 0)})
+_DEFAULT_HEADGEAR_OFFSETS_REL: Offsets = MappingProxyType({"south": (0, -5), "north": (0, 0), "east": (0, 0)})
+
+
+def _get_off(d: str, provided: Offsets | None, defaults: Offsets) -> Tuple[int, int]:
+    # Directions missing from ``provided`` still fall back to the defaults
+    if provided:
+        off = provided.get(d)
+        if off is not None:
+            return off
+    return defaults.get(d, (0, 0))
+
+
+# One direction's layers in draw order: (anchor, image, box). The anchor says which offsets
+# position the layer at composite time: "canvas" (body apparel), "body", "head", and the
+# head-relative "hair", "eyes", "beard" and "headgear". ``box`` is the (left, top, right,
+# bottom) of the image's non-transparent pixels; only that region is blended.
+Stack = List[Tuple[str, np.ndarray, Tuple[int, int, int, int]]]
+# Directions keep the caller's order and repeats, so this is a list of (direction, stack)
+Layers = List[Tuple[str, Stack]]
+
+
+def _alpha_bbox(arr: np.ndarray) -> Tuple[int, int, int, int]:
+    """Bounding box of the pixels with nonzero alpha, or an empty box for a blank image."""
+    alpha = arr[..., 3]
+    rows = np.flatnonzero(alpha.any(axis=1))
+    if not rows.size:
+        return (0, 0, 0, 0)
+    cols = np.flatnonzero(alpha.any(axis=0))
+    return (int(cols[0]), int(rows[0]), int(cols[-1]) + 1, int(rows[-1]) + 1)
+
+
+def prepare_layers(
     assets_root: Path,
     body_type: str,
     hair: str | None,
@@ -33,54 +135,10 @@ def compose_preview(
     eyes_gender: str | None,
     apparels: List[str],
     directions: List[str] | None = None,
-    body_offsets: dict[str, tuple[int, int]] | None = None,
-    head_offsets: dict[str, tuple[int, int]] | None = None,
-    hair_offsets_rel: dict[str, tuple[int, int]] | None = None,
-    eyes_offsets_rel: dict[str, tuple[int, int]] | None = None,
-    beard_offsets_rel: dict[str, tuple[int, int]] | None = None,
-    headgear_offsets_rel: dict[str, tuple[int, int]] | None = None,
-    canvas_offsets: dict[str, tuple[int, int]] | None = None,
     colors: dict[str, tuple[int, int, int]] | None = None,
-) -> Image.Image:
-    dirs = directions or ["north", "south", "east"]
-    # Defaults: per-direction head offset, and relative offsets for hair/eyes/headgear w.r.t head
-    default_head_offsets: Dict[str, Tuple[int, int]] = {
-        "south": (0, -30),
-        "north": (0, 0),
-        "east": (0, 0),
-    }
-    # Per your calibration, use south (0,-5) as baseline for head-relative layers
-    default_hair_offsets_rel: Dict[str, Tuple[int, int]] = {
-        "south": (0, -5),
-        "north": (0, 0),
-        "east": (0, 0),
-    }
-    default_eyes_offsets_rel: Dict[str, Tuple[int, int]] = {
-        "south": (0, -5),
-        "north": (0, 0),
-        "east": (0, 0),
-    }
-    default_beard_offsets_rel: Dict[str, Tuple[int, int]] = {
-        "south": (0, -5),
-        "north": (0, 0),
-        "east": (0, 0),
-    }
-    default_headgear_offsets_rel: Dict[str, Tuple[int, int]] = {
-        "south": (0, -5),
-        "north": (0, 0),
-        "east": (0, 0),
-    }
-
-    def get_off(
-        d: str,
-        provided: Dict[str, Tuple[int, int]] | None,
-        defaults: Dict[str, Tuple[int, int]],
-    ) -> Tuple[int, int]:
-        if provided and d in provided:
-            return provided[d]
-        if d in defaults:
-            return defaults[d]
-        return (0, 0)
+) -> Layers:
+    """Load and recolor every layer once; the result can be composited at many offsets."""
+    dirs = directions or DIRECTIONS
 
     def get_color(key: str) -> Tuple[int, int, int] | None:
         # colors dict supplied by caller; keys: hair, beard, headgear, pants, shirt, outer, belt, apparel
@@ -88,39 +146,17 @@ def compose_preview(
             return colors[key]
         return None
 
-    def apply_color(img: Image.Image, rgb: Tuple[int, int, int] | None) -> Image.Image:
+    def apply_color(img: np.ndarray, rgb: Tuple[int, int, int] | None) -> np.ndarray:
         if not rgb:
             return img
-        src = img.convert("RGBA")
-        alpha = src.split()[-1]
-        lum = src.convert("L")
-        colored = ImageOps.colorize(lum, black=(0, 0, 0), white=rgb)
-        colored.putalpha(alpha)
-        return colored
-
-    frames: List[Image.Image] = []
-    for d in dirs:
-        # Collect placements (image, x, y) so we can size canvas before drawing
-        placements: List[tuple[Image.Image, int, int]] = []
-
-        def place(img: Image.Image, x: int, y: int) -> None:
-            placements.append((img, x, y))
-
-        # Base canvas shift applied before composing (prevents clipping)
-        default_canvas_offsets: Dict[str, Tuple[int, int]] = {
-            "north": (0, 0),
-            "south": (0, 10),
-            "east": (0, 0),
-        }
-        cx, cy = get_off(d, canvas_offsets, default_canvas_offsets)
+        return tint_cached(img, rgb)
+
+    def prepare_dir(d: str) -> Stack:
+        stack: List[Tuple[str, np.ndarray]] = []
 
         body = find_body(assets_root, body_type, d)
-        if body:
-            if body_offsets and d in body_offsets:
-                ox, oy = body_offsets[d]
-                place(apply_color(body, get_color("body")), cx + ox, cy + oy)
-            else:
-                place(apply_color(body, get_color("body")), cx, cy)
+        if body is not None:
+            stack.append(("body", apply_color(body, get_color("body"))))
 
         buckets = collect_apparel_images(assets_root, apparels, body_type, d)
 
@@ -128,70 +164,178 @@ def compose_preview(
         for key in ("pants", "shirt", "outer"):
             for img in buckets[key]:
                 cat_key = key  # direct mapping
-                place(apply_color(img, get_color(cat_key)), cx, cy)
+                stack.append(("canvas", apply_color(img, get_color(cat_key))))
 
         for img in buckets["belt"]:
-            place(apply_color(img, get_color("belt")), cx, cy)
+            stack.append(("canvas", apply_color(img, get_color("belt"))))
 
         # Head above body apparel, below hair/hat
         hd = find_head(assets_root, head, d)
-        if hd:
-            hx, hy = get_off(d, head_offsets, default_head_offsets)
-            place(apply_color(hd, get_color("head")), cx + hx, cy + hy)
+        if hd is not None:
+            stack.append(("head", apply_color(hd, get_color("head"))))
 
         h = find_hair(assets_root, hair, d)
-        if h:
-            hx, hy = get_off(d, head_offsets, default_head_offsets)
-            rx, ry = get_off(d, hair_offsets_rel, default_hair_offsets_rel)
-            place(apply_color(h, get_color("hair")), cx + hx + rx, cy + hy + ry)
+        if h is not None:
+            stack.append(("hair", apply_color(h, get_color("hair"))))
 
-        # Eyes overlay: center relative to head + per-direction relative delta
         ey = load_eyes(assets_root, eyes, eyes_gender)
-        if ey:
-            hx, hy = get_off(d, head_offsets, default_head_offsets)
-            rx, ry = get_off(d, eyes_offsets_rel, default_eyes_offsets_rel)
-            ex_abs = cx + hx + rx
-            ey_abs = cy + hy + ry
-            x = 64 - ey.size[0] // 2 + ex_abs
-            y = 64 - ey.size[1] // 2 + ey_abs
-            place(ey, x, y)
+        if ey is not None:
+            stack.append(("eyes", ey))
 
         b = find_beard(assets_root, beard, d)
-        if b:
-            hx, hy = get_off(d, head_offsets, default_head_offsets)
-            rx, ry = get_off(d, beard_offsets_rel, default_beard_offsets_rel)
-            place(apply_color(b, get_color("beard")), cx + hx + rx, cy + hy + ry)
+        if b is not None:
+            stack.append(("beard", apply_color(b, get_color("beard"))))
 
         for img in buckets["headgear"]:
-            hx, hy = get_off(d, head_offsets, default_head_offsets)
-            rx, ry = get_off(d, headgear_offsets_rel, default_headgear_offsets_rel)
-            place(apply_color(img, get_color("headgear")), cx + hx + rx, cy + hy + ry)
+            stack.append(("headgear", apply_color(img, get_color("headgear"))))
 
         # Any uncategorized apparel renders above outer but below headgear
         for img in buckets["apparel"]:
-            place(apply_color(img, get_color("apparel")), cx, cy)
-
-        # Compose without clipping by sizing to placements' extents
-        if placements:
-            min_x = min(x for _, x, _ in placements)
-            min_y = min(y for _, _, y in placements)
-            max_x = max(x + im.width for im, x, y in placements)
-            max_y = max(y + im.height for im, x, y in placements)
-            out_w = max_x - min_x
-            out_h = max_y - min_y
-            frame = Image.new("RGBA", (out_w, out_h), (0, 0, 0, 0))
-            for im, x, y in placements:
-                frame.alpha_composite(im, (x - min_x, y - min_y))
-            frames.append(frame)
-        else:
-            frames.append(Image.new("RGBA", (128, 128), (0, 0, 0, 0)))
-
-    # stitch horizontally with variable frame sizes
-    total_w = sum(fr.width for fr in frames)
-    max_h = max((fr.height for fr in frames), default=128)
-    out = Image.new("RGBA", (total_w, max_h), (0, 0, 0, 0))
+            stack.append(("canvas", apply_color(img, get_color("apparel"))))
+
+        # Sprites carry wide transparent margins; find the region worth blending once here
+        return [(anchor, img, _alpha_bbox(img)) for anchor, img in stack]
+
+    return list(zip(dirs, _map_dirs(prepare_dir, dirs)))
+
+
+def composite_layers(
+    layers: Layers,
+    body_offsets: dict[str, tuple[int, int]] | None = None,
+    head_offsets: dict[str, tuple[int, int]] | None = None,
+    hair_offsets_rel: dict[str, tuple[int, int]] | None = None,
+    eyes_offsets_rel: dict[str, tuple[int, int]] | None = None,
+    beard_offsets_rel: dict[str, tuple[int, int]] | None = None,
+    headgear_offsets_rel: dict[str, tuple[int, int]] | None = None,
+    canvas_offsets: dict[str, tuple[int, int]] | None = None,
+    out: np.ndarray | None = None,
+) -> np.ndarray:
+    """Place prepared layers at the given offsets and stitch the direction frames horizontally.
+
+    If ``out`` is given (e.g. a cell of a larger grid buffer), frames are written into
+    its top-left corner, clipped to its bounds, and ``out`` is returned.
+    """
+    def plan_dir(item: Tuple[str, Stack]) -> Tuple[List[np.ndarray], List[int], List[int], Tuple[int, int], int, int]:
+        d, stack = item
+        cx, cy = _get_off(d, canvas_offsets, _DEFAULT_CANVAS_OFFSETS)
+        hx, hy = _get_off(d, head_offsets, _DEFAULT_HEAD_OFFSETS)
+        bx, by = _get_off(d, body_offsets, _NO_OFFSETS)
+        # Absolute origin of each anchor for this direction
+        origins: Dict[str, Tuple[int, int]] = {
+            "canvas": (cx, cy),
+            "body": (cx + bx, cy + by),
+            "head": (cx + hx, cy + hy),
+        }
+        for anchor, provided, defaults in (
+            ("hair", hair_offsets_rel, _DEFAULT_HAIR_OFFSETS_REL),
+            ("eyes", eyes_offsets_rel, _DEFAULT_EYES_OFFSETS_REL),
+            ("beard", beard_offsets_rel, _DEFAULT_BEARD_OFFSETS_REL),
+            ("headgear", headgear_offsets_rel, _DEFAULT_HEADGEAR_OFFSETS_REL),
+        ):
+            rx, ry = _get_off(d, provided, defaults)
+            origins[anchor] = (cx + hx + rx, cy + hy + ry)
+
+        # Collect placements as parallel lists so we can size canvas before drawing.
+        # Frame extents use the full image, tracked in the same pass; only the cropped
+        # box is drawn, so the draw positions include its top-left corner
+        imgs: List[np.ndarray] = []
+        xs: List[int] = []
+        ys: List[int] = []
+        min_x = min_y = sys.maxsize
+        max_x = max_y = -sys.maxsize
+        for anchor, img, (left, top, right, bottom) in stack:
+            x, y = origins[anchor]
+            h, w = img.shape[:2]
+            if anchor == "eyes":
+                # Eyes overlay: center relative to head + per-direction relative delta
+                x += 64 - w // 2
+                y += 64 - h // 2
+            if x < min_x:
+                min_x = x
+            if y < min_y:
+                min_y = y
+            if x + w > max_x:
+                max_x = x + w
+            if y + h > max_y:
+                max_y = y + h
+            imgs.append(img[top:bottom, left:right])
+            xs.append(x + left)
+            ys.append(y + top)
+
+        if not imgs:
+            return imgs, xs, ys, (0, 0), 128, 128
+        # Size the frame to the placements' extents so nothing is clipped
+        return imgs, xs, ys, (min_x, min_y), max_x - min_x, max_y - min_y
+
+    # Lay out first, then composite each frame straight into its column of ``out``;
+    # frames are disjoint strips, so there is no separate stitch copy
+    plans = [plan_dir(item) for item in layers]
+    total_w = sum(p[4] for p in plans)
+    max_h = max((p[5] for p in plans), default=128)
+    if out is None:
+        out = np.zeros((max_h, total_w, 4), np.uint8)
+    columns: List[int] = []
     x = 0
-    for fr in frames:
-        out.alpha_composite(fr, (x, 0))
-        x += fr.width
+    for plan in plans:
+        columns.append(x)
+        x += plan[4]
+
+    def draw_dir(i: int) -> None:
+        imgs, xs, ys, origin, w, h = plans[i]
+        x = columns[i]
+        w = min(w, out.shape[1] - x)
+        if w > 0:
+            _composite_np(imgs, xs, ys, origin, out[:min(h, out.shape[0]), x:x + w])
+
+    _map_dirs(draw_dir, list(range(len(plans))))
     return out
+
+
+def compose_preview(
+    assets_root: Path,
+    body_type: str,
+    hair: str | None,
+    beard: str | None,
+    head: str | None,
+    eyes: str | None,
+    eyes_gender: str | None,
+    apparels: List[str],
+    directions: List[str] | None = None,
+    body_offsets: dict[str, tuple[int, int]] | None = None,
+    head_offsets: dict[str, tuple[int, int]] | None = None,
+    hair_offsets_rel: dict[str, tuple[int, int]] | None = None,
+    eyes_offsets_rel: dict[str, tuple[int, int]] | None = None,
+    beard_offsets_rel: dict[str, tuple[int, int]] | None = None,
+    headgear_offsets_rel: dict[str, tuple[int, int]] | None = None,
+    canvas_offsets: dict[str, tuple[int, int]] | None = None,
+    colors: dict[str, tuple[int, int, int]] | None = None,
+    out: np.ndarray | None = None,
+) -> np.ndarray:
+    """Compose N/S/E frames side by side into a single (H, W, 4) uint8 RGBA array.
+
+    If ``out`` is given (e.g. a cell of a larger grid buffer), frames are written into
+    its top-left corner, clipped to its bounds, and ``out`` is returned.
+    """
+    layers = prepare_layers(
+        assets_root=assets_root,
+        body_type=body_type,
+        hair=hair,
+        beard=beard,
+        head=head,
+        eyes=eyes,
+        eyes_gender=eyes_gender,
+        apparels=apparels,
+        directions=directions,
+        colors=colors,
+    )
+    return composite_layers(
+        layers,
+        body_offsets=body_offsets,
+        head_offsets=head_offsets,
+        hair_offsets_rel=hair_offsets_rel,
+        eyes_offsets_rel=eyes_offsets_rel,
+        beard_offsets_rel=beard_offsets_rel,
+        headgear_offsets_rel=headgear_offsets_rel,
+        canvas_offsets=canvas_offsets,
+        out=out,
+    )
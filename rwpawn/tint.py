@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Tuple
+
+import numpy as np
+
+try:
+    from numba import njit  # type: ignore
+except Exception:  # pragma: no cover - optional speedup
+    njit = None  # type: ignore
+
+
+def _tint_np(arr: np.ndarray, rgb: Tuple[int, int, int], out: np.ndarray) -> None:
+    # ITU-R 601-2 luma in 16.16 fixed point, rounded like Pillow's RGB->L conversion
+    lum = arr[..., 0].astype(np.uint32)
+    lum *= 19595
+    tmp = arr[..., 1].astype(np.uint32)
+    tmp *= 38470
+    lum += tmp
+    tmp = arr[..., 2].astype(np.uint32)
+    tmp *= 7471
+    lum += tmp
+    lum += 0x8000
+    lum >>= 16
+    lum = lum.astype(np.uint16)
+    for i, c in enumerate(rgb):
+        v = lum * np.uint16(c)
+        # floor(v / 255) without a division, exact for v <= 255 * 255
+        v += 1 + (v >> 8)
+        v >>= 8
+        out[..., i] = v
+    out[..., 3] = arr[..., 3]
+
+
+if njit is not None:
+
+    @njit(cache=True, nogil=True)
+    def _tint_jit(arr, r, g, b, out):  # pragma: no cover - exercised only with numba installed
+        # Same integer math as _tint_np, fused into one pass over the pixels
+        h, w = arr.shape[0], arr.shape[1]
+        for y in range(h):
+            for x in range(w):
+                lum = (np.int64(arr[y, x, 0]) * 19595 + np.int64(arr[y, x, 1]) * 38470
+                       + np.int64(arr[y, x, 2]) * 7471 + 0x8000) >> 16
+                v = lum * r
+                out[y, x, 0] = (v + 1 + (v >> 8)) >> 8
+                v = lum * g
+                out[y, x, 1] = (v + 1 + (v >> 8)) >> 8
+                v = lum * b
+                out[y, x, 2] = (v + 1 + (v >> 8)) >> 8
+                out[y, x, 3] = arr[y, x, 3]
+
+else:
+    _tint_jit = None
+
+
+def tint_rgba(arr: np.ndarray, rgb: Tuple[int, int, int]) -> np.ndarray:
+    """Recolor an RGBA sprite along a black->``rgb`` gradient of its luminance, keeping alpha.
+
+    Bit-exact with the previous ``convert("L")`` + ``ImageOps.colorize`` + ``putalpha`` path.
+    Uses a numba kernel when numba is installed, else NumPy.
+    """
+    out = np.empty_like(arr)
+    if _tint_jit is not None:
+        r, g, b = rgb
+        _tint_jit(arr, np.int64(r), np.int64(g), np.int64(b), out)
+    else:
+        _tint_np(arr, rgb, out)
+    return out
+
+
+# (id(source), rgb) -> (source, tinted). Holding the source keeps its id from being reused.
+_TINT_CACHE: OrderedDict[tuple, Tuple[np.ndarray, np.ndarray]] = OrderedDict()
+_TINT_CACHE_SIZE = 256
+_TINT_LOCK = threading.Lock()
+
+
+def tint_cached(arr: np.ndarray, rgb: Tuple[int, int, int]) -> np.ndarray:
+    """``tint_rgba`` memoized per (source array, color).
+
+    Only read-only arrays (the shared asset cache entries) are memoized, since a
+    writable array could change under the same id; the cached results are read-only too.
+    """
+    if arr.flags.writeable:
+        return tint_rgba(arr, rgb)
+    key = (id(arr), tuple(rgb))
+    with _TINT_LOCK:
+        hit = _TINT_CACHE.get(key)
+        if hit is not None:
+            _TINT_CACHE.move_to_end(key)
+            return hit[1]
+    out = tint_rgba(arr, rgb)
+    out.flags.writeable = False
+    with _TINT_LOCK:
+        _TINT_CACHE[key] = (arr, out)
+        if len(_TINT_CACHE) > _TINT_CACHE_SIZE:
+            _TINT_CACHE.popitem(last=False)
+    return out
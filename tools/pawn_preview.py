@@ -1,6 +1,8 @@
 #!/usr/bin/env python3
 import argparse
 import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 
@@ -13,9 +15,25 @@ except Exception as e:
 Direction = str
 
 
+@lru_cache(maxsize=1024)
+def _decode_png(path_str: str, mtime_ns: int) -> Tuple[Tuple[int, int], bytes]:
+    # Cache raw RGBA bytes rather than the Image itself, since Images are mutable
+    img = Image.open(path_str)
+    img.load()
+    # Only palette/RGB sprites need converting; tobytes() already gives RGBA ones their own copy
+    if img.mode != "RGBA":
+        img = img.convert("RGBA")
+    return img.size, img.tobytes()
+
+
+def _frombytes(entry: Tuple[Tuple[int, int], bytes]) -> Image.Image:
+    size, data = entry
+    # Zero-copy view over the cached bytes; Pillow copies on first write
+    return Image.frombuffer("RGBA", size, data, "raw", "RGBA", 0, 1)
+
+
 def load_png(path: Path) -> Image.Image:
-    img = Image.open(path).convert("RGBA")
-    return img
+    return _frombytes(_decode_png(str(path), path.stat().st_mtime_ns))
 
 
 def ensure_size(img: Image.Image, target_size: Tuple[int, int] = (128, 128)) -> Image.Image:
@@ -32,13 +50,51 @@ def ensure_size(img: Image.Image, target_size: Tuple[int, int] = (128, 128)) ->
     new_w = max(1, int(round(w * scale)))
     new_h = max(1, int(round(h * scale)))
     resized = img.resize((new_w, new_h), Image.LANCZOS)
+    if (new_w, new_h) == (tw, th):
+        # Aspect already matched (e.g. 256x256 -> 128x128); nothing left to center
+        return resized
     canvas = Image.new("RGBA", target_size, (0, 0, 0, 0))
     ox = (tw - new_w) // 2
     oy = (th - new_h) // 2
-    canvas.alpha_composite(resized, (ox, oy))
+    # paste() without a mask overwrites RGBA as-is, which is what alpha_composite gives on an empty canvas
+    canvas.paste(resized, (ox, oy))
     return canvas
 
 
+@lru_cache(maxsize=1024)
+def _sized_png(path_str: str, mtime_ns: int, target_size: Tuple[int, int]) -> Tuple[Tuple[int, int], bytes]:
+    img = ensure_size(_frombytes(_decode_png(path_str, mtime_ns)), target_size)
+    return img.size, img.tobytes()
+
+
+def load_sprite(path: Path, target_size: Tuple[int, int] = (128, 128)) -> Image.Image:
+    """load_png + ensure_size, decoded and resized once per (path, mtime)."""
+    return _frombytes(_sized_png(str(path), path.stat().st_mtime_ns, target_size))
+
+
+@lru_cache(maxsize=None)
+def _listdir(d: Path) -> frozenset:
+    """Entry names of a directory, read with one scandir per directory (missing dirs are empty)."""
+    try:
+        with os.scandir(d) as it:
+            return frozenset(e.name for e in it)
+    except OSError:
+        return frozenset()
+
+
+@lru_cache(maxsize=None)
+def _listdir_lower(d: Path) -> Dict[str, str]:
+    return {name.lower(): name for name in _listdir(d)}
+
+
+def _find_file(d: Path, name: str) -> Optional[Path]:
+    # Exact case first, then case-insensitive like Path.exists() on macOS/Windows
+    if name in _listdir(d):
+        return d / name
+    match = _listdir_lower(d).get(name.lower())
+    return d / match if match is not None else None
+
+
 def composite_layers(layers: List[Optional[Image.Image]], size=(128, 128)) -> Image.Image:
     base = Image.new("RGBA", size, (0, 0, 0, 0))
     for layer in layers:
@@ -50,9 +106,9 @@ def composite_layers(layers: List[Optional[Image.Image]], size=(128, 128)) -> Im
 
 def find_body(assets_root: Path, body_type: str, direction: Direction) -> Optional[Image.Image]:
     # e.g., Bodies/Naked_Male_north.png
-    path = assets_root / "Bodies" / f"Naked_{body_type}_{direction}.png"
-    if path.exists():
-        return ensure_size(load_png(path))
+    p = _find_file(assets_root / "Bodies", f"Naked_{body_type}_{direction}.png")
+    if p is not None:
+        return load_sprite(p)
     return None
 
 
@@ -60,9 +116,9 @@ def find_hair(assets_root: Path, hair: Optional[str], direction: Direction) -> O
     if not hair:
         return None
     # e.g., Hairs/Afro_north.png
-    p = assets_root / "Hairs" / f"{hair}_{direction}.png"
-    if p.exists():
-        return ensure_size(load_png(p))
+    p = _find_file(assets_root / "Hairs", f"{hair}_{direction}.png")
+    if p is not None:
+        return load_sprite(p)
     return None
 
 
@@ -73,33 +129,49 @@ def find_beard(assets_root: Path, beard: Optional[str], direction: Direction) ->
     # Files look like: BeardStubble_east.png or BeardStubble_south.png
     if direction == "north":
         return None
-    p = assets_root / "Beards" / f"Beard{beard}_{direction}.png"
-    if p.exists():
-        return ensure_size(load_png(p))
+    p = _find_file(assets_root / "Beards", f"Beard{beard}_{direction}.png")
+    if p is not None:
+        return load_sprite(p)
     return None
 
 
+@lru_cache(maxsize=None)
+def _variant_index(apparel_dir: Path, base_name: str) -> Dict[Tuple[str, str], Path]:
+    """Map (body_type, direction) to sprite path for one apparel folder, "*" where the name omits it."""
+    index: Dict[Tuple[str, str], Path] = {}
+    for name in _listdir(apparel_dir):
+        if not (name.startswith(base_name) and name.endswith(".png")):
+            continue
+        rest = name[len(base_name):-len(".png")]
+        if not rest:
+            key = ("*", "*")
+        elif rest[0] != "_":
+            continue
+        else:
+            parts = rest[1:].rsplit("_", 1)
+            key = ("*", parts[0]) if len(parts) == 1 else (parts[0], parts[1])
+        index[key] = apparel_dir / name
+    return index
+
+
 def find_apparel_variant(apparel_dir: Path, base_name: str, body_type: str, direction: Direction) -> Optional[Path]:
     # Prefer body type variant, then generic direction variant, then single sprite fallback
-    candidates = [
-        apparel_dir / f"{base_name}_{body_type}_{direction}.png",
-        apparel_dir / f"{base_name}_{direction}.png",
-        apparel_dir / f"{base_name}.png",
-    ]
-    for c in candidates:
-        if c.exists():
-            return c
+    index = _variant_index(apparel_dir, base_name)
+    for key in ((body_type, direction), ("*", direction), ("*", "*")):
+        p = index.get(key)
+        if p is not None:
+            return p
     return None
 
 
 def find_apparel_images(assets_root: Path, apparels: List[str], body_type: str, direction: Direction) -> List[Image.Image]:
-    images: List[Image.Image] = []
+    paths: List[Path] = []
     for name in apparels:
-        apparel_dir = assets_root / "Apparel" / name
-        if not apparel_dir.exists():
+        parent = assets_root / "Apparel"
+        apparel_dir = parent / name
+        if name not in _listdir(parent):
             # Try to find a matching subdir by case-insensitive search
-            parent = assets_root / "Apparel"
-            matches = [d for d in parent.iterdir() if d.is_dir() and d.name.lower() == name.lower()]
+            matches = [parent / n for n in sorted(_listdir(parent)) if n.lower() == name.lower() and (parent / n).is_dir()]
             if matches:
                 apparel_dir = matches[0]
             else:
@@ -110,9 +182,12 @@ def find_apparel_images(assets_root: Path, apparels: List[str], body_type: str,
         if p is None:
             # no variant for this direction
             continue
-        img = ensure_size(load_png(p))
-        images.append(img)
-    return images
+        paths.append(p)
+    if len(paths) < 2:
+        return [load_sprite(p) for p in paths]
+    # PNG decode and resize release the GIL, so independent sprites load in parallel
+    with ThreadPoolExecutor(max_workers=min(4, len(paths))) as ex:
+        return list(ex.map(load_sprite, paths))
 
 
 def build_preview(
@@ -155,7 +230,7 @@ def build_preview(
     width = 128 * len(frames)
     out = Image.new("RGBA", (width, 128), (0, 0, 0, 0))
     for i, fr in enumerate(frames):
-        out.alpha_composite(fr, (i * 128, 0))
+        out.paste(fr, (i * 128, 0))
     return out
 
 
@@ -197,7 +272,8 @@ def main() -> None:
     )
     out_path = Path(args.out)
     out_path.parent.mkdir(parents=True, exist_ok=True)
-    img.save(out_path)
+    # Previews are regenerated often; fast zlib beats smaller files here
+    img.save(out_path, format="PNG", optimize=False, compress_level=1)
     print(f"Wrote {out_path} ({img.size[0]}x{img.size[1]})")
 
 